@@ -12,6 +12,9 @@ from claude_agent_sdk import ClaudeSDKClient, ClaudeAgentOptions
 # Load environment variables from .env file
 load_dotenv()
 
+# Absolute path of the KYC documents directory, computed once at import time
+KYC_DOCS_ABS = str((Path(__file__).parent / "kyc_documents").resolve())
+
 
 def setup_kyc_agent():
     """
@@ -25,9 +28,6 @@ def setup_kyc_agent():
     - Glob: Find files by pattern
     """
 
-    # Get the KYC documents directory path
-    kyc_docs_path = Path(__file__).parent / "kyc_documents"
-
     # Configure the agent options
     options = ClaudeAgentOptions(
         # Allow specific tools for document processing
@@ -37,7 +37,7 @@ def setup_kyc_agent():
         permission_mode='acceptEdits',
 
         # Set working directory to KYC documents folder
-        cwd=str(kyc_docs_path.absolute()),
+        cwd=KYC_DOCS_ABS,
 
         # Optional: Load project settings from .claude directory
         # setting_sources=["project"],
@@ -8,7 +8,11 @@ KYC Agent CLI - Interactive Command Line Interface
 
 import os
 import sys
+import json
+import time
 import asyncio
+import inspect
+import argparse
 from pathlib import Path
 from dotenv import load_dotenv
 from rich.console import Console
@@ -16,74 +20,204 @@ from rich.panel import Panel
 from rich.prompt import Prompt
 from rich.markdown import Markdown
 from rich.table import Table
+from rich.live import Live
 from claude_agent_sdk import (
     ClaudeSDKClient,
     ClaudeAgentOptions,
     AssistantMessage,
+    UserMessage,
     TextBlock,
     ToolUseBlock,
-    ToolResultBlock
+    ToolResultBlock,
+    ResultMessage,
+    tool,
+    create_sdk_mcp_server
 )
+from claude_agent_sdk.types import StreamEvent  # 0.1.x 未在顶层包导出
+import anthropic
 
 # Load environment variables
 load_dotenv()
 
 console = Console()
 
+# KYC 文档目录的绝对路径，模块加载时计算一次
+KYC_DOCS_ABS = str((Path(__file__).parent / "kyc_documents").resolve())
 
-class KYCAgentCLI:
-    """KYC Agent 交互式命令行工具"""
+# 工具分级：两组工具都会交给 SDK 加载，PREFERRED_TOOLS 是系统提示中要求 Agent 优先使用的子集
+PREFERRED_TOOLS = [
+    "Read", "Glob", "Search",
+    "mcp__kyc__list_documents", "mcp__kyc__preview_file",
+]
+FALLBACK_TOOLS = ["Write", "Bash", "Grep"]
 
-    def __init__(self):
-        self.agent = None
-        self.kyc_docs_path = Path(__file__).parent / "kyc_documents"
-        self.session_active = False
-        self.show_react_steps = False  # 是否显示 ReAct 过程
+# 文件预览工具单次读取的最大字节数
+PREVIEW_BYTES = 8192
 
-    def check_api_key(self) -> bool:
-        """检查 API Key 是否配置"""
-        if not os.getenv("ANTHROPIC_API_KEY"):
-            console.print(
-                "[red]错误：未找到 ANTHROPIC_API_KEY 环境变量[/red]"
-            )
-            console.print(
-                "请在 .env 文件中配置你的 API Key\n"
-                "参考：https://console.anthropic.com/settings/keys"
-            )
-            return False
-        return True
+# 系统提示：指导 Agent 安全地处理文件。
+# 内容固定不变，通过 system_prompt 下发一次，由 Claude Code 作为可缓存的前缀复用，
+# 每轮只需发送用户问题本身。
+SYSTEM_PROMPT = f"""你是一个 KYC 文档处理助手，工作目录下存放着企业的 KYC 材料。
 
-    async def initialize_agent(self):
-        """初始化 KYC Agent"""
-        try:
-            options = ClaudeAgentOptions(
-                allowed_tools=["Read", "Write", "Bash", "Grep", "Glob", "Search"],
-                permission_mode='acceptEdits',
-                cwd=str(self.kyc_docs_path.absolute()),
-            )
+⚠️ 重要提示（请务必遵守）：
 
-            self.agent = ClaudeSDKClient(options=options)
+1. **文件大小限制**：
+   - 文件大小直接取自文档清单或 `mcp__kyc__list_documents` 工具，无需再用 Bash 查看
+   - 跳过大于 500KB 的文件（PDF、图片、音频等）
+   - 对于这些大文件，只返回文件名、大小、类型等元信息
 
-            # 重要：必须先连接才能使用
-            await self.agent.connect()
-            self.session_active = True
+2. **读取文件时的限制**：
+   - 查看文件内容请使用 `mcp__kyc__preview_file` 工具，它只读取文件开头至多 {PREVIEW_BYTES} 字节，不要用 `cat`
+   - 只需要少量内容时传入更小的 max_bytes（如 500），不要重复预览同一个文件
+   - Excel/CSV 文件：只读取前几行数据
+   - 确需用 Bash 时，使用 `head -n 20` 而不是 `cat`，只读取前 20 行
 
-            console.print(
-                Panel(
-                    f"[green]✓ KYC Agent 初始化成功[/green]\n\n"
-                    f"工作目录：{self.kyc_docs_path}\n"
-                    f"可用工具：{', '.join(options.allowed_tools)}",
-                    title="Agent 状态",
-                    border_style="green"
-                )
-            )
-        except Exception as e:
-            console.print(f"[red]初始化失败：{e}[/red]")
-            sys.exit(1)
+3. **推荐的命令**：
+   - 列出文件：优先使用 `mcp__kyc__list_documents` 工具（无需访问文件系统），其次 `ls -lh` 或 `find . -type f`
+   - 查看大小：文档清单或 `mcp__kyc__list_documents` 工具已包含每个文件的大小
+   - 预览文本：`mcp__kyc__preview_file` 工具（path 为相对工作目录的路径）
+   - 搜索内容：`grep -n "关键词" filename | head -n 10`
 
-    def show_welcome(self):
-        """显示欢迎信息"""
-        welcome_text = """
+4. **必须跳过的文件类型**：
+   - 图片：.png, .jpg, .jpeg, .gif
+   - PDF：.pdf
+   - 音频：.m4a, .mp3, .wav
+   - 视频：.mp4, .avi, .mov
+   - 对这些文件只报告元信息
+
+5. **优先策略**：
+   - 优先使用 {'、'.join(PREFERRED_TOOLS)} 完成列表和预览，只有确实需要时才使用 {'、'.join(FALLBACK_TOOLS)}
+   - 优先使用文件系统命令（ls, find, du）获取信息
+   - 需要内容时，先确认文件大小安全
+   - 需要查看多个文件的内容时，每个文件只预览开头部分，不要完整读取
+
+6. **并行调用工具**：
+   - 相互独立的工具调用（如同时查看多个目录、统计多类文件、预览多个文件的开头）请在同一轮回复中一次性发出
+   - 不要等上一个工具返回后再发起与其结果无关的下一个调用
+
+请按照这些规则处理用户的问题。
+"""
+
+# Agent 不应读取内容的文件类型：preview_file 工具对这些类型只返回提示，不读取文件
+SKIP_EXT = frozenset({
+    ".pdf", ".png", ".jpg", ".jpeg", ".gif",
+    ".m4a", ".mp3", ".wav", ".mp4", ".avi", ".mov",
+})
+
+# 注入系统提示的文档清单上限（字节）。
+# SDK 通过命令行参数 --system-prompt 传递系统提示，Windows 命令行总长约 32K 字符，
+# 因此在 Windows 上留出足够余量；Linux 单个参数上限为 128KB
+MANIFEST_LIMIT = 8 * 1024 if sys.platform == "win32" else 50 * 1024
+
+MANIFEST_TEMPLATE = """
+## 文档清单（会话开始时生成）
+
+以下是工作目录下所有文档的 [相对路径, 大小(字节)] 列表。回答"有哪些文件"之类的问题时直接使用，无需调用工具；
+如果用户提到清单中没有的新文件，再使用工具确认：
+
+{manifest}
+"""
+
+# 自定义工具单次返回的 JSON 列表上限（字节），超出的条目不再列出
+TOOL_RESULT_LIMIT = 256 * 1024
+
+# SDK 缓冲单条 CLI 输出消息的上限（字节，SDK 默认 1MB）。
+# 工具结果过大时超过该上限会报 "exceeded maximum buffer size"
+MAX_BUFFER_SIZE = 10 * 1024 * 1024
+
+# 批量模式（Message Batches API）使用的模型与轮询参数
+BATCH_MODEL = "claude-sonnet-4-5"
+BATCH_MAX_TOKENS = 4096
+BATCH_POLL_INTERVAL = 30  # 秒
+
+# 批量模式的系统提示：批量请求是单轮调用，没有任何工具可用，因此不包含工具使用规则
+BATCH_SYSTEM_PROMPT = """你是一个 KYC 文档处理助手，负责回答与企业 KYC 材料相关的问题。
+
+本次为批量模式的单轮问答：
+- 你无法读取任何文件内容，也没有任何工具可以调用；下方附有文档清单（仅文件路径和大小）
+- 不要描述或假装执行任何命令或工具调用，直接给出回答
+- 如果问题必须查看具体文档才能回答，请说明需要哪些材料以及需要核对的要点
+"""
+
+BATCH_MANIFEST_TEMPLATE = """
+## 文档清单（提交批量任务时生成）
+
+以下是工作目录下所有文档的 [相对路径, 大小(字节)] 列表，可据此回答有哪些文件、是否缺少材料等问题：
+
+{manifest}
+"""
+
+
+def read_head(path: str, n: int = PREVIEW_BYTES) -> bytes:
+    """读取文件开头至多 n 个字节（单次 read，内存占用与文件大小无关）"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return os.read(fd, n)
+    finally:
+        os.close(fd)
+
+
+def preview_file(path: str, n: int = PREVIEW_BYTES) -> str:
+    """读取文件开头至多 n 个字节并解码为文本"""
+    return read_head(path, n).decode("utf-8", "replace")
+
+
+def dump_within(items, limit: int) -> tuple[str, int]:
+    """把 items 逐条序列化为紧凑的 JSON 数组，总长度不超过 limit 字节
+
+    按条目截断，结果始终是完整的 JSON；返回 (JSON 文本, 未列出的条目数)。
+    """
+    entries = []
+    used = 2  # 外层的 "[]"
+    for item in items:
+        entry = json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+        used += len(entry.encode("utf-8")) + 1
+        if used > limit:
+            break
+        entries.append(entry)
+    return "[" + ",".join(entries) + "]", len(items) - len(entries)
+
+
+def file_ext(name: str) -> str:
+    """取文件扩展名（小写、不含点），没有扩展名时返回空字符串"""
+    _, dot, ext = name.rpartition(".")
+    return ext.lower() if dot else ""
+
+
+SIZE_UNITS = ("B", "KB", "MB")
+
+
+def format_size(size: int) -> str:
+    """格式化文件大小：按 bit_length 直接算出单位，不逐级比较"""
+    unit_idx = min(max(size.bit_length() - 1, 0) // 10, len(SIZE_UNITS) - 1)
+    if unit_idx == 0:
+        return f"{size} B"
+    return f"{size / (1 << (10 * unit_idx)):.1f} {SIZE_UNITS[unit_idx]}"
+
+
+class StreamingAnswer:
+    """流式回答的可渲染对象：只累积文本片段，在 Live 刷新时才渲染 Markdown"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def append(self, text: str):
+        self.chunks.append(text)
+
+    def __bool__(self) -> bool:
+        return bool(self.chunks)
+
+    def __rich__(self):
+        if not self.chunks:
+            return ""
+        return Panel(
+            Markdown("".join(self.chunks)),
+            title="💬 Agent 回答",
+            border_style="blue"
+        )
+
+
+WELCOME_TEXT = """
 # 🤖 KYC Agent CLI - 智能文档处理助手
 
 欢迎使用 KYC Agent！我可以帮你：
@@ -129,51 +263,282 @@ class KYCAgentCLI:
 - 📊 总共执行了多少次工具调用
 
 开始提问吧！
+"""
+
+
+def _build_help_table() -> Table:
+    """构建命令帮助表"""
+    table = Table(title="可用命令", show_header=True, header_style="bold cyan")
+    table.add_column("命令", style="green", width=20)
+    table.add_column("说明", style="white")
+
+    commands = [
+        ("/help", "显示此帮助信息"),
+        ("/list", "列出 kyc_documents 目录下的所有文件"),
+        ("/list --type xlsx", "只列出指定扩展名的文件"),
+        ("/list --no-stat", "只列出文件名，不读取文件大小（适合网络挂载目录）"),
+        ("/status", "显示 Agent 当前状态"),
+        ("/debug", "切换调试模式（显示 ReAct 推理过程）"),
+        ("/refresh", "重新扫描文档并刷新 Agent 的文档清单（会清空对话上下文）"),
+        ("/clear", "清除屏幕"),
+        ("/quit 或 /exit", "退出程序"),
+        ("其他任何问题", "直接输入你的问题，Agent 会自动处理"),
+    ]
+
+    for cmd, desc in commands:
+        table.add_row(cmd, desc)
+
+    return table
+
+
+def _build_examples_table() -> Table:
+    """构建示例问题表"""
+    examples_table = Table(
+        title="示例问题", show_header=True, header_style="bold magenta"
+    )
+    examples_table.add_column("问题类型", style="cyan", width=20)
+    examples_table.add_column("示例", style="white")
+
+    examples = [
+        ("文档列表", "有哪些文档？给我列个清单"),
+        ("信息提取", "提取营业执照上的公司名称和注册资本"),
+        ("文档分析", "分析法人王传福的征信报告"),
+        ("数据汇总", "汇总主要客户和供应商的信息"),
+        ("完整性检查", "检查企业材料是否齐全，缺少什么"),
+        ("财务分析", "分析财务报表中的关键指标"),
+    ]
+
+    for q_type, example in examples:
+        examples_table.add_row(q_type, example)
+
+    return examples_table
+
+
+# 欢迎信息和帮助表都只依赖常量，模块加载时构建一次，之后直接复用
+_WELCOME = Markdown(WELCOME_TEXT)
+_HELP_TABLE = _build_help_table()
+_EXAMPLES_TABLE = _build_examples_table()
+
+
+class KYCAgentCLI:
+    """KYC Agent 交互式命令行工具"""
+
+    def __init__(self):
+        self.agent = None
+        # 文档目录的绝对路径：字符串供 os.scandir / cwd 直接使用，Path 供路径校验使用
+        self.kyc_docs_abs = KYC_DOCS_ABS
+        self.kyc_docs_path = Path(self.kyc_docs_abs)
+        self.session_active = False
+        self.show_react_steps = False  # 是否显示 ReAct 过程
+        self.preferred_tools = PREFERRED_TOOLS
+        self.allowed_tools = self.preferred_tools + FALLBACK_TOOLS
+        # 最近一次扫描的结果：相对路径 -> 大小
+        self._doc_cache: dict[str, int] = {}
+        # 按扩展名（小写、不含点）索引的相对路径，用于按类型快速查询
+        self._by_ext: dict[str, list[str]] = {}
+        # 斜杠命令分发表
+        self._cmds = {
+            "/help": self.show_help,
+            "/list": self.list_documents,
+            "/status": self.show_status,
+            "/refresh": self.refresh_manifest,
+            "/debug": self._toggle_debug,
+            "/clear": console.clear,
+            "/quit": self._quit,
+            "/exit": self._quit,
+            "/q": self._quit,
+        }
+
+    def _create_tool_server(self):
+        """创建进程内的 MCP 工具服务（供 Agent 直接调用，无需经过 Bash）"""
+        docs_root = self.kyc_docs_path
+
+        @tool(
+            "list_documents",
+            "列出工作目录下的文档（相对路径、大小），可用 ext 按扩展名过滤（如 xlsx）。每次调用都会重新扫描，结果反映目录的当前状态",
+            {"type": "object", "properties": {"ext": {"type": "string"}}},
+        )
+        async def list_documents_tool(args):
+            # 扫描只做 stat、不读文件内容，每次都重新扫描，保证能发现会话开始后新增或删除的文件
+            await asyncio.to_thread(self._scan_documents)
+            ext = args.get("ext")
+            if ext:
+                paths = self._by_ext.get(ext.lstrip(".").lower(), [])
+            else:
+                paths = self._doc_cache
+            text, omitted = dump_within(
+                [{"path": rel_path, "size": self._doc_cache[rel_path]} for rel_path in paths],
+                TOOL_RESULT_LIMIT,
+            )
+            if omitted:
+                text += f"\n（结果过长，另有 {omitted} 个文件未列出，请用 ext 参数缩小范围）"
+            return {"content": [{"type": "text", "text": text}]}
+
+        @tool(
+            "preview_file",
+            f"预览文件开头内容（最多 {PREVIEW_BYTES} 字节），path 为相对工作目录的路径",
+            {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string"},
+                    "max_bytes": {"type": "integer"},
+                },
+                "required": ["path"],
+            },
+        )
+        async def preview_file_tool(args):
+            target = (docs_root / args["path"]).resolve()
+            if not target.is_relative_to(docs_root):
+                return {
+                    "content": [{"type": "text", "text": "只能预览工作目录内的文件"}],
+                    "is_error": True,
+                }
+            if target.suffix.lower() in SKIP_EXT:
+                return {
+                    "content": [{"type": "text", "text": f"{target.suffix} 文件不支持预览，请只报告其元信息"}],
+                    "is_error": True,
+                }
+            try:
+                max_bytes = args.get("max_bytes")
+                n = PREVIEW_BYTES if max_bytes is None else max(1, min(int(max_bytes), PREVIEW_BYTES))
+                text = await asyncio.to_thread(preview_file, str(target), n)
+            except (TypeError, ValueError):
+                return {
+                    "content": [{"type": "text", "text": "max_bytes 必须是整数"}],
+                    "is_error": True,
+                }
+            except OSError as e:
+                return {
+                    "content": [{"type": "text", "text": f"预览失败：{e}"}],
+                    "is_error": True,
+                }
+            return {"content": [{"type": "text", "text": text}]}
+
+        return create_sdk_mcp_server(
+            name="kyc", version="1.0.0", tools=[list_documents_tool, preview_file_tool]
+        )
+
+    @staticmethod
+    def check_api_key() -> bool:
+        """检查 API Key 是否配置"""
+        if not os.getenv("ANTHROPIC_API_KEY"):
+            console.print(
+                "[red]错误：未找到 ANTHROPIC_API_KEY 环境变量[/red]"
+            )
+            console.print(
+                "请在 .env 文件中配置你的 API Key\n"
+                "参考：https://console.anthropic.com/settings/keys"
+            )
+            return False
+        return True
+
+    def _build_manifest(self) -> str:
+        """根据文档缓存生成紧凑的 JSON 清单（[相对路径, 大小]），总长度不超过 MANIFEST_LIMIT"""
+        manifest, omitted = dump_within(list(self._doc_cache.items()), MANIFEST_LIMIT)
+        if omitted:
+            manifest += f"\n（清单过长，另有 {omitted} 个文件未列出，请使用工具查询）"
+        return manifest
+
+    async def _connect(self):
+        """扫描文档、生成带文档清单的系统提示并连接 Agent
+
+        连接成功后才替换 self.agent，失败时原有连接保持不变。
         """
-        console.print(Markdown(welcome_text))
+        # 会话开始时预先扫描一次，把清单放进（可缓存的）系统提示，列表类问题无需再调用工具
+        try:
+            await asyncio.to_thread(self._scan_documents)
+            system_prompt = SYSTEM_PROMPT + MANIFEST_TEMPLATE.format(manifest=self._build_manifest())
+        except Exception as e:
+            # 清单只是优化，扫描失败时不附带清单，Agent 仍可通过工具查看文档
+            console.print(f"[yellow]扫描文档目录失败（{e}），本次会话不附带文档清单[/yellow]")
+            system_prompt = SYSTEM_PROMPT
+
+        options = ClaudeAgentOptions(
+            allowed_tools=self.allowed_tools,
+            system_prompt=system_prompt,
+            mcp_servers={"kyc": self._create_tool_server()},
+            permission_mode='acceptEdits',
+            cwd=self.kyc_docs_abs,
+            include_partial_messages=True,  # 逐 token 流式输出回答
+            max_buffer_size=MAX_BUFFER_SIZE,
+        )
 
-    def show_help(self):
-        """显示帮助信息"""
-        table = Table(title="可用命令", show_header=True, header_style="bold cyan")
-        table.add_column("命令", style="green", width=20)
-        table.add_column("说明", style="white")
-
-        commands = [
-            ("/help", "显示此帮助信息"),
-            ("/list", "列出 kyc_documents 目录下的所有文件"),
-            ("/status", "显示 Agent 当前状态"),
-            ("/debug", "切换调试模式（显示 ReAct 推理过程）"),
-            ("/clear", "清除屏幕"),
-            ("/quit 或 /exit", "退出程序"),
-            ("其他任何问题", "直接输入你的问题，Agent 会自动处理"),
-        ]
-
-        for cmd, desc in commands:
-            table.add_row(cmd, desc)
-
-        console.print(table)
-        console.print()
+        agent = ClaudeSDKClient(options=options)
 
-        # 示例问题
-        examples_table = Table(
-            title="示例问题", show_header=True, header_style="bold magenta"
+        # 重要：必须先连接才能使用
+        try:
+            await agent.connect()
+        except Exception:
+            # 连接中途失败时关闭已启动的 CLI 进程，再把异常交给调用方处理
+            await agent.disconnect()
+            raise
+        self.agent = agent
+        self.session_active = True
+
+    def _render_agent_status(self):
+        """显示 Agent 初始化结果"""
+        console.print(
+            Panel(
+                f"[green]✓ KYC Agent 初始化成功[/green]\n\n"
+                f"工作目录：{self.kyc_docs_path}\n"
+                f"文档清单：{len(self._doc_cache)} 个文件\n"
+                f"可用工具：{', '.join(self.allowed_tools)}\n"
+                f"优先使用：{', '.join(self.preferred_tools)}（仅为提示词中的偏好）",
+                title="Agent 状态",
+                border_style="green"
+            )
         )
-        examples_table.add_column("问题类型", style="cyan", width=20)
-        examples_table.add_column("示例", style="white")
 
-        examples = [
-            ("文档列表", "有哪些文档？给我列个清单"),
-            ("信息提取", "提取营业执照上的公司名称和注册资本"),
-            ("文档分析", "分析法人王传福的征信报告"),
-            ("数据汇总", "汇总主要客户和供应商的信息"),
-            ("完整性检查", "检查企业材料是否齐全，缺少什么"),
-            ("财务分析", "分析财务报表中的关键指标"),
-        ]
+    async def initialize_agent(self, connect_task: asyncio.Task | None = None):
+        """初始化 KYC Agent
+
+        传入已经启动的连接任务时只等待其完成，否则在这里发起连接。
+        """
+        try:
+            if connect_task is None:
+                await self._connect()
+            else:
+                await connect_task
+        except Exception as e:
+            console.print(f"[red]初始化失败：{e}[/red]")
+            sys.exit(1)
+
+        self._render_agent_status()
+
+    async def refresh_manifest(self):
+        """重新扫描文档并以新的文档清单重连 Agent"""
+        console.print("[cyan]正在刷新文档清单...[/cyan]")
+        # 系统提示只能在连接时设置，刷新清单需要重新连接。
+        # 先建立新连接再断开旧连接，新连接失败时继续使用原来的 Agent
+        old_agent = self.agent if self.session_active else None
+        try:
+            await self._connect()
+        except Exception as e:
+            console.print(
+                f"[red]刷新文档清单失败：{e}[/red]\n"
+                "[dim]仍在使用原来的 Agent 连接，可稍后再次执行 /refresh[/dim]"
+            )
+            return
+
+        if old_agent:
+            try:
+                await old_agent.disconnect()
+            except Exception:
+                pass
+        console.print(
+            f"[green]✓ 文档清单已更新（{len(self._doc_cache)} 个文件）[/green]\n"
+            "[dim]已重新连接 Agent，之前的对话上下文已清空[/dim]"
+        )
 
-        for q_type, example in examples:
-            examples_table.add_row(q_type, example)
+    def show_welcome(self):
+        """显示欢迎信息"""
+        console.print(_WELCOME)
 
-        console.print(examples_table)
+    def show_help(self):
+        """显示帮助信息"""
+        console.print(_HELP_TABLE)
+        console.print()
+        console.print(_EXAMPLES_TABLE)
 
     def show_status(self):
         """显示 Agent 状态"""
@@ -181,45 +546,159 @@ class KYCAgentCLI:
             f"[green]✓ Agent 运行中[/green]\n\n"
             f"工作目录：{self.kyc_docs_path}\n"
             f"会话状态：{'活跃' if self.session_active else '未初始化'}\n"
+            f"可用工具：{', '.join(self.allowed_tools)}\n"
+            f"优先使用：{', '.join(self.preferred_tools)}（仅为提示词中的偏好）\n"
             f"模型：Claude Sonnet 4.5",
             title="Agent 状态",
             border_style="green"
         )
         console.print(status_panel)
 
-    def list_documents(self):
-        """列出所有文档"""
-        console.print("[cyan]正在扫描文档目录...[/cyan]")
+    def _walk_documents(self, root: str):
+        """递归遍历目录（基于 os.scandir，文件类型直接取自 readdir 结果，不额外 stat）
+
+        不进入目录的符号链接，但指向文件的符号链接照常列出；无法读取的目录直接跳过。
+        """
         try:
-            all_files = list(self.kyc_docs_path.rglob("*"))
-            files = [f for f in all_files if f.is_file() and not f.name.startswith('.')]
+            it = os.scandir(root)
+        except OSError:
+            return
+        with it:
+            for entry in it:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    is_file = not is_dir and entry.is_file()
+                except OSError:
+                    continue
+                if is_dir:
+                    yield from self._walk_documents(entry.path)
+                elif is_file:
+                    yield entry
+
+    def _scan_documents(self) -> list[tuple[str, int, str]]:
+        """扫描文档目录，返回 (文件名, 大小, 相对目录) 列表（同步阻塞，需在线程中调用）
+
+        同时刷新 self._doc_cache 和 self._by_ext。只使用 stat 信息，不读取任何文件内容。
+        """
+        root = self.kyc_docs_abs
+        rows = []
+        cache = {}
+        by_ext = {}
+        for entry in self._walk_documents(root):
+            # 每个文件只 stat 一次，之后复用 st。Linux 上 readdir 只提供文件类型，
+            # 第一次 DirEntry.stat() 仍是一次系统调用（结果缓存在 entry 上）；Windows 上直接来自目录项
+            try:
+                st = entry.stat()
+            except OSError:
+                # 文件在遍历期间被删除或无权限访问，跳过
+                continue
+            rel_path = os.path.relpath(entry.path, root)
+            by_ext.setdefault(file_ext(entry.name), []).append(rel_path)
+
+            cache[rel_path] = st.st_size
+            rows.append((entry.name, st.st_size, os.path.dirname(rel_path) or "."))
+        # 整体替换，已删除的文件随之移出缓存
+        self._doc_cache = cache
+        self._by_ext = by_ext
+        return rows
+
+    def _scan_names(self, ext: str | None = None) -> list[tuple[str, str]]:
+        """只列出文件名，返回 (文件名, 相对目录) 列表，不做任何 stat（适合网络挂载目录）"""
+        root = self.kyc_docs_abs
+        rows = []
+        for entry in self._walk_documents(root):
+            if ext is not None and file_ext(entry.name) != ext:
+                continue
+            rel_path = os.path.relpath(entry.path, root)
+            rows.append((entry.name, os.path.dirname(rel_path) or "."))
+        return rows
+
+    async def list_documents(self, args: str = ""):
+        """列出所有文档，支持 `--type <扩展名>` 按类型过滤、`--no-stat` 只列文件名"""
+        ext = None
+        no_stat = False
+        parts = args.split()
+        while parts:
+            opt = parts.pop(0)
+            if opt == "--no-stat":
+                no_stat = True
+            elif opt == "--type" and parts:
+                ext = parts.pop(0).lstrip(".").lower()
+            else:
+                console.print(
+                    "[yellow]用法：/list [--type <扩展名>] [--no-stat]，例如 /list --type xlsx[/yellow]"
+                )
+                return
 
-            if not files:
+        console.print("[cyan]正在扫描文档目录...[/cyan]")
+        try:
+            # 目录遍历是阻塞 I/O，放到线程中执行，避免卡住事件循环
+            if no_stat:
+                names = await asyncio.to_thread(self._scan_names, ext)
+                rows = [(name, None, rel_parent) for name, rel_parent in names]
+            else:
+                rows = await asyncio.to_thread(self._scan_documents)
+            if ext is not None and not no_stat:
+                rows = [
+                    (os.path.basename(rel_path), self._doc_cache[rel_path],
+                     os.path.dirname(rel_path) or ".")
+                    for rel_path in self._by_ext.get(ext, [])
+                ]
+
+            if not rows:
                 console.print("[yellow]未找到任何文档[/yellow]")
                 return
 
-            table = Table(title=f"文档列表 (共 {len(files)} 个文件)", show_header=True)
+            title = f"文档列表 (共 {len(rows)} 个文件)"
+            if ext is not None:
+                title = f"{ext} 文档列表 (共 {len(rows)} 个文件)"
+            table = Table(title=title, show_header=True)
             table.add_column("序号", style="cyan", width=6)
             table.add_column("文件名", style="white")
-            table.add_column("大小", style="green", width=12)
+            if not no_stat:
+                table.add_column("大小", style="green", width=12)
             table.add_column("路径", style="dim")
 
-            for idx, file in enumerate(files, 1):
-                size = file.stat().st_size
-                if size < 1024:
-                    size_str = f"{size} B"
-                elif size < 1024 * 1024:
-                    size_str = f"{size / 1024:.1f} KB"
+            for idx, (name, size, rel_parent) in enumerate(rows, 1):
+                if no_stat:
+                    table.add_row(str(idx), name, rel_parent)
                 else:
-                    size_str = f"{size / (1024 * 1024):.1f} MB"
-
-                rel_path = file.relative_to(self.kyc_docs_path)
-                table.add_row(str(idx), file.name, size_str, str(rel_path.parent))
+                    table.add_row(str(idx), name, format_size(size), rel_parent)
 
             console.print(table)
         except Exception as e:
             console.print(f"[red]列出文档失败：{e}[/red]")
 
+    def _quit(self) -> bool:
+        """退出程序"""
+        console.print("[yellow]再见！[/yellow]")
+        return False
+
+    def _toggle_debug(self):
+        """切换调试模式"""
+        self.show_react_steps = not self.show_react_steps
+        status = "开启" if self.show_react_steps else "关闭"
+        console.print(f"[cyan]调试模式已{status}[/cyan]")
+        if self.show_react_steps:
+            console.print("[dim]现在会显示 Agent 的推理和工具使用过程[/dim]")
+
+    def _print_tool_result(self, block: ToolResultBlock, tool_use_count: int):
+        """调试模式：显示工具结果"""
+        result_preview = str(block.content)
+        if len(result_preview) > 200:
+            result_preview = result_preview[:200] + "..."
+
+        console.print(
+            Panel(
+                f"[green]{result_preview}[/green]",
+                title=f"✅ 工具结果 #{tool_use_count}",
+                border_style="green",
+                expand=False
+            )
+        )
+
     async def process_command(self, user_input: str) -> bool:
         """处理用户命令"""
         user_input = user_input.strip()
@@ -227,34 +706,16 @@ class KYCAgentCLI:
         if not user_input:
             return True
 
-        # 处理特殊命令
-        if user_input in ["/quit", "/exit", "/q"]:
-            console.print("[yellow]再见！[/yellow]")
-            return False
-
-        if user_input == "/help":
-            self.show_help()
-            return True
-
-        if user_input == "/list":
-            self.list_documents()
-            return True
-
-        if user_input == "/status":
-            self.show_status()
-            return True
-
-        if user_input == "/debug":
-            self.show_react_steps = not self.show_react_steps
-            status = "开启" if self.show_react_steps else "关闭"
-            console.print(f"[cyan]调试模式已{status}[/cyan]")
-            if self.show_react_steps:
-                console.print("[dim]现在会显示 Agent 的推理和工具使用过程[/dim]")
-            return True
-
-        if user_input == "/clear":
-            os.system('clear' if os.name == 'posix' else 'cls')
-            return True
+        # 处理特殊命令：处理函数返回 False 表示退出
+        cmd, _, arg = user_input.partition(" ")
+        arg = arg.strip()
+        handler = self._cmds.get(cmd)
+        # 目前只有 /list 接受参数，其他命令带参数时按普通问题处理
+        if handler and (not arg or cmd == "/list"):
+            result = handler(arg) if arg else handler()
+            if inspect.isawaitable(result):
+                result = await result
+            return result is not False
 
         # 处理普通问题 - 调用 Agent（异步）
         await self.query_agent(user_input)
@@ -265,93 +726,71 @@ class KYCAgentCLI:
         try:
             console.print(f"\n[dim]正在处理你的问题...[/dim]\n")
 
-            # 添加系统提示，指导 Agent 安全地处理文件
-            enhanced_prompt = f"""
-用户问题：{question}
-
-⚠️ 重要提示（请务必遵守）：
-
-1. **文件大小限制**：
-   - 读取任何文件前，先用 `ls -lh` 或 `stat` 检查文件大小
-   - 跳过大于 500KB 的文件（PDF、图片、音频等）
-   - 对于这些大文件，只返回文件名、大小、类型等元信息
-
-2. **读取文件时的限制**：
-   - 使用 `head -n 20` 而不是 `cat`，只读取前 20 行
-   - Excel/CSV 文件：只读取前几行数据
-   - 文本文件：只读取前 500 字节
-
-3. **推荐的命令**：
-   - 列出文件：`ls -lh` 或 `find . -type f`
-   - 查看大小：`du -h` 或 `stat`
-   - 预览文本：`head -n 20 filename`
-   - 搜索内容：`grep -n "关键词" filename | head -n 10`
-
-4. **必须跳过的文件类型**：
-   - 图片：.png, .jpg, .jpeg, .gif
-   - PDF：.pdf
-   - 音频：.m4a, .mp3, .wav
-   - 视频：.mp4, .avi, .mov
-   - 对这些文件只报告元信息
-
-5. **优先策略**：
-   - 优先使用文件系统命令（ls, find, du）获取信息
-   - 需要内容时，先确认文件大小安全
-   - 分批处理，不要一次性读取多个文件
-
-请按照这些规则处理用户的问题。
-"""
-
-            # 发送增强后的查询
-            await self.agent.query(enhanced_prompt)
+            # 处理规则已在 SYSTEM_PROMPT 中，这里只发送用户问题
+            await self.agent.query(question)
 
             # 接收并显示响应（支持显示 ReAct 过程）
-            response_text = ""
+            answer = StreamingAnswer()
             tool_use_count = 0
-
-            async for message in self.agent.receive_response():
-                if isinstance(message, AssistantMessage):
-                    for block in message.content:
-                        # 显示文本回答
-                        if isinstance(block, TextBlock):
-                            response_text += block.text
-
-                        # 调试模式：显示工具使用
-                        elif isinstance(block, ToolUseBlock) and self.show_react_steps:
-                            tool_use_count += 1
-                            console.print(
-                                Panel(
-                                    f"[cyan]工具名称:[/cyan] {block.name}\n"
-                                    f"[cyan]工具输入:[/cyan] {block.input}",
-                                    title=f"🔧 工具调用 #{tool_use_count}",
-                                    border_style="cyan",
-                                    expand=False
+            streamed = False  # 当前这轮回答是否已通过流式事件输出
+
+            with Live(answer, console=console, refresh_per_second=12):
+                async for message in self.agent.receive_response():
+                    # 流式文本片段：边生成边显示
+                    if isinstance(message, StreamEvent):
+                        event = message.event
+                        if (
+                            message.parent_tool_use_id is None
+                            and event.get("type") == "content_block_delta"
+                            and event.get("delta", {}).get("type") == "text_delta"
+                        ):
+                            answer.append(event["delta"]["text"])
+                            streamed = True
+
+                    elif isinstance(message, AssistantMessage):
+                        for block in message.content:
+                            # 显示文本回答（已流式输出的部分不再重复追加）
+                            if isinstance(block, TextBlock):
+                                if not streamed:
+                                    answer.append(block.text)
+
+                            # 调试模式：显示工具使用
+                            elif isinstance(block, ToolUseBlock) and self.show_react_steps:
+                                tool_use_count += 1
+                                console.print(
+                                    Panel(
+                                        f"[cyan]工具名称:[/cyan] {block.name}\n"
+                                        f"[cyan]工具输入:[/cyan] {block.input}",
+                                        title=f"🔧 工具调用 #{tool_use_count}",
+                                        border_style="cyan",
+                                        expand=False
+                                    )
                                 )
-                            )
-
-                        # 调试模式：显示工具结果
-                        elif isinstance(block, ToolResultBlock) and self.show_react_steps:
-                            result_preview = str(block.content)
-                            if len(result_preview) > 200:
-                                result_preview = result_preview[:200] + "..."
-
-                            console.print(
-                                Panel(
-                                    f"[green]{result_preview}[/green]",
-                                    title=f"✅ 工具结果 #{tool_use_count}",
-                                    border_style="green",
-                                    expand=False
-                                )
-                            )
-
-            # 显示 Agent 的最终响应
-            if response_text:
-                console.print(Panel(
-                    Markdown(response_text),
-                    title="💬 Agent 回答",
-                    border_style="blue"
-                ))
-            else:
+
+                            # 调试模式：显示工具结果
+                            elif isinstance(block, ToolResultBlock) and self.show_react_steps:
+                                self._print_tool_result(block, tool_use_count)
+
+                        # 下一轮回答重新判断是否有流式事件
+                        streamed = False
+
+                    # 调试模式：工具结果以 UserMessage 的形式返回
+                    elif isinstance(message, UserMessage) and self.show_react_steps:
+                        if isinstance(message.content, list):
+                            for block in message.content:
+                                if isinstance(block, ToolResultBlock):
+                                    self._print_tool_result(block, tool_use_count)
+
+                    # 调试模式：显示 prompt 缓存命中情况
+                    elif isinstance(message, ResultMessage) and self.show_react_steps and message.usage:
+                        cache_read = message.usage.get("cache_read_input_tokens", 0)
+                        cache_write = message.usage.get("cache_creation_input_tokens", 0)
+                        console.print(
+                            f"[dim]Prompt 缓存：命中 {cache_read} tokens，写入 {cache_write} tokens[/dim]"
+                        )
+
+            # Live 退出后最终回答保留在屏幕上
+            if not answer:
                 console.print("[yellow]Agent 没有返回文本响应[/yellow]")
 
             # 调试模式：显示统计
@@ -379,11 +818,12 @@ class KYCAgentCLI:
         if not self.check_api_key():
             sys.exit(1)
 
-        # 显示欢迎信息
-        self.show_welcome()
+        # 先发起连接（扫描文档 + 启动 Agent），连接期间在线程中渲染欢迎信息
+        connect_task = asyncio.create_task(self._connect())
+        await asyncio.to_thread(self.show_welcome)
 
-        # 初始化 Agent（异步）
-        await self.initialize_agent()
+        # 等待 Agent 初始化完成（异步）
+        await self.initialize_agent(connect_task)
 
         console.print("\n[bold green]开始对话吧！输入 /help 查看帮助[/bold green]\n")
 
@@ -418,10 +858,142 @@ class KYCAgentCLI:
                 console.print("[green]连接已断开[/green]")
 
 
+def run_batch(questions_path: Path, output_path: Path):
+    """批量模式：通过 Message Batches API 提交问题并写出结果
+
+    questions_path 为 JSONL 文件，每行形如 {"custom_id": "...", "question": "..."}（custom_id 可省略）。
+    任何一行格式有误时列出所有出错的行号并退出，不会提交部分问题。
+    批量请求是单轮调用，Agent 不会执行任何工具，适合无需读取文件即可回答的问题。
+    """
+    items = []
+    errors = []
+    used = set()  # 用户指定的 custom_id
+    with open(questions_path, encoding="utf-8") as f:
+        for idx, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                errors.append(f"第 {idx} 行：不是合法的 JSON（{e.msg}）")
+                continue
+            question = item.get("question") if isinstance(item, dict) else None
+            if not isinstance(question, str) or not question.strip():
+                errors.append(f"第 {idx} 行：缺少 question 字段")
+                continue
+            custom_id = item.get("custom_id", "")
+            if not isinstance(custom_id, str):
+                errors.append(f"第 {idx} 行：custom_id 必须是字符串")
+                continue
+            if custom_id in used:
+                errors.append(f"第 {idx} 行：custom_id {custom_id!r} 重复")
+                continue
+            if custom_id:
+                used.add(custom_id)
+            items.append((idx, item))
+
+    if errors:
+        console.print("[red]问题文件格式错误：[/red]")
+        for err in errors:
+            console.print(f"[red]  {err}[/red]")
+        sys.exit(1)
+
+    # 批量模式同样附上文档清单，让单轮回答也能知道有哪些材料
+    cli = KYCAgentCLI()
+    cli._scan_documents()
+    system_prompt = BATCH_SYSTEM_PROMPT + BATCH_MANIFEST_TEMPLATE.format(manifest=cli._build_manifest())
+
+    requests = []
+    for idx, item in items:
+        custom_id = item.get("custom_id")
+        if not custom_id:
+            # 未指定时按行号生成，并避开用户已经使用的 id
+            custom_id = f"q{idx}"
+            while custom_id in used:
+                custom_id += "_"
+            used.add(custom_id)
+        requests.append({
+            "custom_id": custom_id,
+            "params": {
+                "model": BATCH_MODEL,
+                "max_tokens": BATCH_MAX_TOKENS,
+                # 所有请求共用同一段系统提示（含文档清单）。文档较少时提示不足模型的最小可缓存长度
+                # （Sonnet 为 1024 tokens），此时 API 会忽略 cache_control，不影响结果
+                "system": [{
+                    "type": "text",
+                    "text": system_prompt,
+                    "cache_control": {"type": "ephemeral"},
+                }],
+                "messages": [{"role": "user", "content": item["question"]}],
+            },
+        })
+
+    if not requests:
+        console.print("[yellow]问题文件为空，没有需要提交的请求[/yellow]")
+        return
+
+    client = anthropic.Anthropic()
+    batch = client.messages.batches.create(requests=requests)
+    console.print(f"[cyan]已提交批量任务 {batch.id}（共 {len(requests)} 个问题）[/cyan]")
+
+    with console.status("[dim]等待批量任务完成...[/dim]"):
+        while batch.processing_status != "ended":
+            time.sleep(BATCH_POLL_INTERVAL)
+            batch = client.messages.batches.retrieve(batch.id)
+
+    succeeded = 0
+    with open(output_path, "w", encoding="utf-8") as out:
+        for entry in client.messages.batches.results(batch.id):
+            record = {"custom_id": entry.custom_id, "status": entry.result.type}
+            if entry.result.type == "succeeded":
+                succeeded += 1
+                record["answer"] = "".join(
+                    block.text for block in entry.result.message.content
+                    if block.type == "text"
+                )
+            elif entry.result.type == "errored":
+                record["error"] = str(entry.result.error)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    console.print(
+        f"[green]✓ 批量任务完成：成功 {succeeded}/{len(requests)}，"
+        f"结果已写入 {output_path}[/green]"
+    )
+
+
 def main():
     """主入口"""
+    parser = argparse.ArgumentParser(description="KYC Agent CLI")
+    parser.add_argument(
+        "--batch", type=Path, metavar="QUESTIONS_JSONL",
+        help="非交互模式：通过 Message Batches API 批量处理 JSONL 文件中的问题"
+    )
+    parser.add_argument(
+        "--output", type=Path, default=Path("batch_results.jsonl"),
+        help="批量模式的结果输出文件（默认：batch_results.jsonl）"
+    )
+    args = parser.parse_args()
+
+    if args.batch:
+        if not KYCAgentCLI.check_api_key():
+            sys.exit(1)
+        run_batch(args.batch, args.output)
+        return
+
+    # 可选：POSIX 上使用 uvloop 作为事件循环（未安装时沿用 asyncio 默认实现）。
+    # 通过 asyncio.Runner 的 loop_factory 指定，不依赖 Python 3.12 起弃用的事件循环策略接口
+    loop_factory = None
+    if sys.platform != "win32":
+        try:
+            import uvloop
+            loop_factory = uvloop.new_event_loop
+        except ImportError:
+            pass
+
     cli = KYCAgentCLI()
-    asyncio.run(cli.run())
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(cli.run())
 
 
 if __name__ == "__main__":